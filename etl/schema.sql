@@ -1 +1,51 @@
 CREATE TABLE IF NOT EXISTS patients(patient_id INT);
+
+-- The loader replaces this with the real dimension each run. Defining it here
+-- lets the view below be created on a fresh database.
+CREATE TABLE IF NOT EXISTS diagnoses(
+    diagnosis_code TEXT,
+    diagnosis_desc TEXT
+);
+
+-- KPI tables. Unique keys let the loader upsert with ON CONFLICT instead of
+-- DELETE + INSERT, so reruns update in place and history accumulates.
+CREATE TABLE IF NOT EXISTS kpi_readmission_30d(
+    as_of_date DATE PRIMARY KEY,
+    readmission_rate REAL
+);
+
+CREATE TABLE IF NOT EXISTS kpi_avg_los(
+    as_of_date DATE PRIMARY KEY,
+    avg_los_days REAL
+);
+
+CREATE TABLE IF NOT EXISTS kpi_admissions_by_dx(
+    as_of_date DATE,
+    diagnosis_code TEXT,
+    admissions_count INT,
+    PRIMARY KEY (as_of_date, diagnosis_code)
+);
+
+CREATE TABLE IF NOT EXISTS kpi_daily_census(
+    census_date DATE PRIMARY KEY,
+    inpatient_count INT
+);
+
+-- Supports ad-hoc "top diagnoses" queries over the full KPI history. The
+-- dashboard itself reads the materialized kpi_top_dx table written by load().
+CREATE INDEX IF NOT EXISTS ix_by_dx_count ON kpi_admissions_by_dx(admissions_count DESC);
+
+-- Pre-joined, pre-sorted Top-10 admissions-by-diagnosis for the dashboard.
+-- The aggregation runs inside the database engine instead of pandas, and the
+-- dashboard only ships 10 pre-aggregated rows to Python. Restricted to the
+-- latest as_of_date because the KPI table keeps history across runs.
+-- DROP + CREATE instead of CREATE VIEW IF NOT EXISTS, which PostgreSQL
+-- doesn't support.
+DROP VIEW IF EXISTS kpi_admissions_by_dx_v;
+CREATE VIEW kpi_admissions_by_dx_v AS
+SELECT d.diagnosis_desc, k.admissions_count
+FROM kpi_admissions_by_dx k
+LEFT JOIN diagnoses d ON d.diagnosis_code = k.diagnosis_code
+WHERE k.as_of_date = (SELECT MAX(as_of_date) FROM kpi_admissions_by_dx)
+ORDER BY k.admissions_count DESC
+LIMIT 10;
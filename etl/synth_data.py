@@ -10,11 +10,14 @@ All data is fake; no PHI.
 """
 
 import argparse
+import os
+
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from datetime import datetime
 from pathlib import Path
-import random
 
 # A small set of ICD-like diagnosis codes and descriptions
 DIAGNOSES = [
@@ -28,20 +31,26 @@ DIAGNOSES = [
     ("M54", "Dorsalgia [back pain]"),
 ]
 
+# One seeded generator shared by every sampling call: runs are reproducible
+# (override with SEED=...) and all draws go through NumPy's batched PCG64.
+RNG = np.random.default_rng(int(os.getenv("SEED", "0")))
+
 
 def gen_patients(n_patients: int = 500) -> pd.DataFrame:
     """Generate a simple patients dimension table."""
-    genders = ["M", "F"]
     birth_starts = datetime(1940, 1, 1)
     birth_ends = datetime(2010, 12, 31)
     delta_days = (birth_ends - birth_starts).days
 
-    rows = []
-    for pid in range(1, n_patients + 1):
-        g = random.choice(genders)
-        bd = birth_starts + timedelta(days=random.randint(0, delta_days))
-        rows.append({"patient_id": pid, "gender": g, "birth_date": bd.date()})
-    return pd.DataFrame(rows)
+    # Sample all patients at once with NumPy instead of looping row by row
+    genders = np.take(np.array(["M", "F"]), RNG.integers(0, 2, n_patients))
+    offsets = RNG.integers(0, delta_days + 1, n_patients)
+    birth_dates = np.datetime64(birth_starts, "D") + offsets.astype("timedelta64[D]")
+    return pd.DataFrame({
+        "patient_id": np.arange(1, n_patients + 1),
+        "gender": genders,
+        "birth_date": birth_dates,
+    })
 
 
 def gen_diagnoses() -> pd.DataFrame:
@@ -53,28 +62,34 @@ def gen_admissions(n_adm: int = 2000, n_patients: int = 500,
                    start_dt: datetime = datetime(2024, 1, 1),
                    end_dt: datetime = datetime(2025, 7, 31)) -> pd.DataFrame:
     """Generate a fact-like admissions table with random LOS and diagnoses."""
-    rows = []
     day_span = (end_dt - start_dt).days
-    for aid in range(1, n_adm + 1):
-        pid = random.randint(1, n_patients)
-        hospital_id = random.randint(1, 5)
-        room_id = f"W{random.randint(1, 20)}-B{random.randint(1, 4)}"
-        admit_day = start_dt + timedelta(days=random.randint(0, day_span))
-        # LOS sampled from a gamma distribution -> skewed long tail, realistic for LOS
-        los_days = max(1, int(np.random.gamma(shape=2.0, scale=2.0)))
-        discharge_day = admit_day + timedelta(days=los_days)
-        dx_code, _ = random.choice(DIAGNOSES)
-
-        rows.append({
-            "admission_id": aid,
-            "patient_id": pid,
-            "admit_time": admit_day,
-            "discharge_time": discharge_day,
-            "primary_diagnosis": dx_code,
-            "hospital_id": hospital_id,
-            "room_id": room_id
-        })
-    return pd.DataFrame(rows)
+
+    # Sample every column as a whole array in one call each; no per-row Python loop
+    pid = RNG.integers(1, n_patients + 1, n_adm)
+    hospital_id = RNG.integers(1, 6, n_adm)
+    admit_offsets = RNG.integers(0, day_span + 1, n_adm)
+    # LOS sampled from a gamma distribution -> skewed long tail, realistic for LOS
+    los = np.maximum(1, RNG.gamma(shape=2.0, scale=2.0, size=n_adm).astype(np.int64))
+    dx_codes = np.take(np.array([c for c, _ in DIAGNOSES]), RNG.integers(0, len(DIAGNOSES), n_adm))
+
+    admit_time = np.datetime64(start_dt, "D") + admit_offsets.astype("timedelta64[D]")
+    discharge_time = admit_time + los.astype("timedelta64[D]")
+
+    # Build room labels like "W12-B3" with array string ops instead of per-row f-strings
+    wards = RNG.integers(1, 21, n_adm)
+    beds = RNG.integers(1, 5, n_adm)
+    room_id = np.char.add(np.char.add(np.char.add("W", wards.astype(str)), "-B"),
+                          beds.astype(str))
+
+    return pd.DataFrame({
+        "admission_id": np.arange(1, n_adm + 1),
+        "patient_id": pid,
+        "admit_time": admit_time,
+        "discharge_time": discharge_time,
+        "primary_diagnosis": dx_codes,
+        "hospital_id": hospital_id,
+        "room_id": room_id,
+    })
 
 
 def main():
@@ -92,11 +107,14 @@ def main():
     diagnoses = gen_diagnoses()
     admissions = gen_admissions(args.rows, args.patients)
 
-    patients.to_csv(outdir / "patients.csv", index=False)
-    diagnoses.to_csv(outdir / "diagnoses.csv", index=False)
-    admissions.to_csv(outdir / "admissions.csv", index=False)
+    # Write each dataset twice: Parquet (what the pipeline prefers -- columnar,
+    # compressed, typed) and CSV via PyArrow's multithreaded writer, kept for
+    # eyeballing and for tools that only speak CSV.
+    for name, df in (("patients", patients), ("diagnoses", diagnoses), ("admissions", admissions)):
+        df.to_parquet(outdir / f"{name}.parquet", compression="zstd")
+        pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), outdir / f"{name}.csv")
 
-    print(f"Wrote: {outdir} (patients.csv, diagnoses.csv, admissions.csv)")
+    print(f"Wrote: {outdir} (patients, diagnoses, admissions as .parquet and .csv)")
 
 
 if __name__ == "__main__":